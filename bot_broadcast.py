@@ -0,0 +1,313 @@
+import asyncio
+import os
+import re
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from telegram import Bot
+from telegram.error import Forbidden, BadRequest, RetryAfter
+
+import bot_redis_store
+from bot_helpers import logger, get_strings, BUNDLES
+from bot_lifecycle import stopping, track
+
+# -----------------------------
+# Configuration
+# -----------------------------
+POLL_INTERVAL = float(os.getenv("BROADCAST_POLL_INTERVAL", "5"))
+# Telegram allows ~30 messages/s per bot; stay below it.
+SEND_INTERVAL = float(os.getenv("BROADCAST_SEND_INTERVAL", "0.05"))
+# UTC hours "start-end" (end exclusive) in which "offpeak" jobs may send.
+OFFPEAK_HOURS = os.getenv("BROADCAST_OFFPEAK_HOURS", "1-7")
+CHECKPOINT_EVERY = 50
+LEADER_TTL_MS = 30_000
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_DELAY_RE = re.compile(r"^(\d+)([mhd])$")
+_DELAY_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+# -----------------------------
+# Scheduling helpers
+# -----------------------------
+
+def _is_segment(arg: str) -> bool:
+    if arg == "all":
+        return True
+    if arg.startswith("lang:"):
+        return arg[len("lang:"):] in BUNDLES
+    if arg.startswith("active:"):
+        days = arg[len("active:"):]
+        return days.isdigit() and int(days) >= 1
+    return False
+
+
+def parse_broadcast_args(args) -> dict | None:
+    """Parse `/broadcast [delay] [offpeak] [segment]` arguments; None when invalid.
+
+    `chat:<name>` must come last: it takes the remaining arguments so chat
+    names with spaces can be targeted.
+    """
+    opts = {"segment": "all", "delay": 0, "offpeak": 0}
+    segment = None
+    args = list(args or [])
+    for i, arg in enumerate(args):
+        if segment is None and arg.startswith("chat:"):
+            name = " ".join(args[i:])[len("chat:"):].strip()
+            if not name:
+                return None
+            opts["segment"] = f"chat:{name}"
+            return opts
+        match = _DELAY_RE.match(arg)
+        if match:
+            opts["delay"] = int(match[1]) * _DELAY_UNITS[match[2]]
+        elif arg == "offpeak":
+            opts["offpeak"] = 1
+        elif segment is None and _is_segment(arg):
+            segment = arg
+        else:
+            return None
+    if segment:
+        opts["segment"] = segment
+    return opts
+
+
+def _offpeak_window() -> tuple[int, int]:
+    start, end = OFFPEAK_HOURS.split("-", 1)
+    return int(start), int(end)
+
+
+def in_offpeak(now: datetime) -> bool:
+    start, end = _offpeak_window()
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+def next_offpeak_start(now: datetime) -> float:
+    start, _ = _offpeak_window()
+    candidate = now.replace(hour=start, minute=0, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    return candidate.timestamp()
+
+
+async def enqueue_broadcast(from_chat: int, msg_id: int, owner_id: int, lang: str, opts: dict) -> int:
+    """Queue a copy of *msg_id* for the audience described by *opts*."""
+    job = {
+        "from_chat": from_chat,
+        "msg_id": msg_id,
+        "owner_id": owner_id,
+        "lang": lang,
+        "segment": opts["segment"],
+        "offpeak": opts["offpeak"],
+    }
+    job_id = await bot_redis_store.create_broadcast_job(job, time.time() + opts["delay"])
+    logger.info("Broadcast %s queued: %s", job_id, job)
+    return job_id
+
+
+# -----------------------------
+# Sending
+# -----------------------------
+
+async def _audience(job: dict) -> list[int]:
+    """Users in the job's segment, in a stable order so `cursor` can resume it."""
+    segment = job.get("segment", "all")
+    if segment.startswith("active:"):
+        users = await bot_redis_store.get_active_users(int(segment[len("active:"):]))
+    else:
+        lang = segment[len("lang:"):] if segment.startswith("lang:") else None
+        users = await bot_redis_store.get_users(lang)
+    return sorted(int(uid) for uid in users)
+
+
+async def _is_member(bot: Bot, chat_id: int, user_id: int) -> bool | None:
+    """Whether *user_id* is in *chat_id*; None when the lookup itself failed."""
+    try:
+        member = await bot.get_chat_member(chat_id=chat_id, user_id=user_id)
+
+    except RetryAfter as e:
+        await asyncio.sleep(e.retry_after)
+        try:
+            member = await bot.get_chat_member(chat_id=chat_id, user_id=user_id)
+        except Exception:
+            return None
+
+    except Exception:
+        return None
+    return member.status in {"member", "administrator", "creator"}
+
+
+async def _send(bot: Bot, user_id: int, job: dict) -> bool:
+    from_chat, msg_id = int(job["from_chat"]), int(job["msg_id"])
+    try:
+        await bot.copy_message(chat_id=user_id, from_chat_id=from_chat, message_id=msg_id)
+        return True
+
+    except RetryAfter as e:
+        await asyncio.sleep(e.retry_after)
+        try:
+            await bot.copy_message(user_id, from_chat, msg_id)
+            return True
+        except (Forbidden, BadRequest, Exception):
+            return False
+
+    except (Forbidden, BadRequest, Exception):
+        return False
+
+
+async def _heartbeat(lost: asyncio.Event) -> None:
+    """Renew the leader lease while a job sends, so flood-wait sleeps or slow
+    get_chat_member calls can't let it lapse; set *lost* if renewal fails."""
+    while True:
+        await asyncio.sleep(LEADER_TTL_MS / 3000)
+        try:
+            renewed = await bot_redis_store.acquire_broadcast_leader(WORKER_ID, LEADER_TTL_MS)
+        except Exception as exc:
+            logger.warning("Broadcast lease renewal failed: %s", exc)
+            renewed = False
+        if not renewed:
+            lost.set()
+            return
+
+
+async def _keep_running(job_id, job: dict) -> bool:
+    """Checkpoint hook: False when the job must stop (paused, cancelled,
+    outside its off-peak window or shutting down)."""
+    if stopping.is_set():
+        return False
+    status = (await bot_redis_store.get_broadcast_job(job_id)).get("status")
+    if status != "running":
+        return False
+    now = datetime.now(timezone.utc)
+    if int(job["offpeak"]) and not in_offpeak(now):
+        if await bot_redis_store.transition_broadcast_job(job_id, "scheduled", ("running",)):
+            await bot_redis_store.reschedule_broadcast_job(job_id, next_offpeak_start(now))
+        return False
+    return True
+
+
+async def run_job(bot: Bot, job_id) -> None:
+    """Send one job from its saved cursor, checkpointing progress as it goes."""
+    job = await bot_redis_store.get_broadcast_job(job_id)
+    if not job or job["status"] in {"done", "cancelled"}:
+        await bot_redis_store.drop_broadcast_job(job_id)
+        return
+    if job["status"] == "paused":
+        return
+
+    now = datetime.now(timezone.utc)
+    if int(job["offpeak"]) and not in_offpeak(now):
+        await bot_redis_store.reschedule_broadcast_job(job_id, next_offpeak_start(now))
+        return
+
+    member_chat = None
+    if job["segment"].startswith("chat:"):
+        chat_name = job["segment"][len("chat:"):]
+        chat = (await bot_redis_store.get_chats()).get(chat_name)
+        if not chat:
+            # The chat was removed after the job was queued.
+            logger.warning("Broadcast %s: unknown chat segment %s", job_id, job["segment"])
+            if await bot_redis_store.transition_broadcast_job(job_id, "cancelled", ("scheduled", "running")):
+                await bot.send_message(
+                    int(job["owner_id"]),
+                    text=get_strings(job.get("lang"))["broadcast_auto_cancelled"].format(
+                        job_id=job_id, chat_name=chat_name),
+                )
+            return
+        member_chat = chat["chat_id"]
+
+    cursor = int(job["cursor"])
+    successes, fails = int(job["successes"]), int(job["fails"])
+    users = [uid for uid in await _audience(job) if uid > cursor]
+    if not await bot_redis_store.claim_broadcast_job(job_id, WORKER_ID):
+        logger.info("Broadcast %s: not claimable by %s, skipping", job_id, WORKER_ID)
+        return
+    logger.info("Broadcast %s: sending to %s users from cursor %s", job_id, len(users), cursor)
+
+    lost = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(lost))
+    try:
+        for n, uid in enumerate(users, 1):
+            # Another replica may have taken over if our lease lapsed; never
+            # send once we're no longer the leader.
+            if lost.is_set() or not await bot_redis_store.is_broadcast_leader(WORKER_ID):
+                await bot_redis_store.update_broadcast_job(job_id, cursor=cursor, successes=successes, fails=fails)
+                logger.warning("Broadcast %s: lost leader lease at cursor %s", job_id, cursor)
+                return
+            # Every API call counts against the flood limit, lookups included.
+            membership = True
+            if member_chat is not None:
+                membership = await _is_member(bot, member_chat, uid)
+                await asyncio.sleep(SEND_INTERVAL)
+
+            if membership is None:
+                fails += 1
+            elif membership:
+                if await _send(bot, uid, job):
+                    successes += 1
+                else:
+                    fails += 1
+            # Advance before pausing: a drain cancel during the sleep
+            # must not resend to this user.
+            cursor = uid
+            if membership:
+                await asyncio.sleep(SEND_INTERVAL)
+
+            if n % CHECKPOINT_EVERY == 0:
+                await bot_redis_store.update_broadcast_job(job_id, cursor=cursor, successes=successes, fails=fails)
+                if not await _keep_running(job_id, job):
+                    logger.info("Broadcast %s stopped at cursor %s", job_id, cursor)
+                    return
+    except asyncio.CancelledError:
+        # Drain deadline hit mid-batch: save exact progress so the next
+        # leader resumes after the last user we actually handled.
+        await bot_redis_store.update_broadcast_job(job_id, cursor=cursor, successes=successes, fails=fails)
+        logger.info("Broadcast %s cancelled at cursor %s", job_id, cursor)
+        raise
+    finally:
+        heartbeat.cancel()
+
+    await bot_redis_store.update_broadcast_job(job_id, cursor=cursor, successes=successes, fails=fails)
+    if not await bot_redis_store.transition_broadcast_job(job_id, "done", ("running",)):
+        # Paused or cancelled after the last checkpoint; leave that state alone.
+        logger.info("Broadcast %s finished sending but is no longer running", job_id)
+        return
+    await bot.send_message(
+        int(job["owner_id"]),
+        text=get_strings(job.get("lang"))["broadcast_done"].format(successes=successes, fails=fails),
+    )
+
+
+# -----------------------------
+# Worker lifecycle
+# -----------------------------
+
+async def _worker(bot: Bot) -> None:
+    try:
+        while not stopping.is_set():
+            try:
+                if await bot_redis_store.acquire_broadcast_leader(WORKER_ID, LEADER_TTL_MS):
+                    for job_id in await bot_redis_store.due_broadcast_jobs(time.time()):
+                        if stopping.is_set():
+                            break
+                        await run_job(bot, job_id)
+            except Exception as exc:
+                logger.warning("Broadcast worker iteration failed: %s", exc)
+            try:
+                await asyncio.wait_for(stopping.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await bot_redis_store.release_broadcast_leader(WORKER_ID)
+        logger.info("Broadcast worker %s stopped", WORKER_ID)
+
+
+async def start_worker(application) -> None:
+    """post_init hook: start the broadcast worker as a tracked background task."""
+    track(_worker(application.bot), name="broadcast-worker")
+    logger.info("Broadcast worker %s started", WORKER_ID)
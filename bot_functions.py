@@ -1,23 +1,22 @@
-import asyncio
-
 from telegram import Update, CallbackQuery
-from telegram.error import Forbidden, BadRequest, RetryAfter
+from telegram.error import Forbidden
 from telegram.ext import ContextTypes
 
 import bot_menus
 import bot_redis_store
-from bot_helpers import logger, STRINGS, is_owner, TARGET_GROUP_ID, is_authorised
+from bot_helpers import logger, TARGET_GROUP_ID, is_authorised, get_strings, user_lang
 
 
 async def run_search_and_forward(
     update: Update, context: ContextTypes.DEFAULT_TYPE, query: str,
 ) -> None:
     user_id = update.effective_user.id
+    strings = get_strings(user_lang(update.effective_user))
     logger.info(f"Searching for {query}")
     matches = await bot_redis_store.do_search(query)
     logger.info(f"Found {len(matches)} matches")
     if not matches:
-        await update.message.reply_text(STRINGS["no_matches"])
+        await update.message.reply_text(strings["no_matches"])
         return
 
     for mid in sorted(matches):
@@ -28,7 +27,8 @@ async def run_search_and_forward(
             continue
 
 
-async def check_membership(user_id: int, context: ContextTypes.DEFAULT_TYPE, ) -> bool:
+async def check_membership(user_id: int, context: ContextTypes.DEFAULT_TYPE, lang: str | None = None) -> bool:
+    strings = get_strings(lang)
     chats = await bot_redis_store.get_chats()
     logger.info(f'chats {chats}')
     missing_chats = {}
@@ -54,7 +54,7 @@ async def check_membership(user_id: int, context: ContextTypes.DEFAULT_TYPE, ) -
         reply_markup = bot_menus.chat_list_menu(missing_chats)
         await context.bot.send_message(
             user_id,
-            STRINGS["join_channels"] + "\n" + STRINGS["join_channels_suffix"],
+            strings["join_channels"] + "\n" + strings["join_channels_suffix"],
             reply_markup=reply_markup
         )
         return False
@@ -63,44 +63,12 @@ async def check_membership(user_id: int, context: ContextTypes.DEFAULT_TYPE, ) -
 
 
 async def delete_chat(data, query: CallbackQuery):
+    strings = get_strings(user_lang(query.from_user))
     await bot_redis_store.del_chat(data)
-    await query.edit_message_text(STRINGS["chat_removed"].format(chat_name=data))
+    await query.edit_message_text(strings["chat_removed"].format(chat_name=data))
     return
 
 
-async def _broadcast(from_chat: int, msg_id: int, owner_id: int,
-                     update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not is_owner(update.effective_user.id, owner_id):
-        return
-
-    users = await bot_redis_store.get_users()
-    successes = fails = 0
-
-    for uid in users:
-        try:
-            await ctx.bot.copy_message(
-                chat_id=int(uid),
-                from_chat_id=from_chat,
-                message_id=msg_id,
-            )
-            successes += 1
-
-        except RetryAfter as e:
-            await asyncio.sleep(e.retry_after)
-            try:
-                await ctx.bot.copy_message(int(uid), from_chat, msg_id)
-                successes += 1
-            except (Forbidden, BadRequest, Exception):
-                fails += 1
-
-        except (Forbidden, BadRequest, Exception):
-            fails += 1
-
-    await ctx.bot.send_message(
-        owner_id,
-        text=STRINGS["broadcast_done"].format(successes=successes, fails=fails),
-    )
-
 async def passive_find(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Treat any plain text in private chat as a search query (after /start)."""
     chat = update.effective_chat
@@ -114,17 +82,18 @@ async def passive_find(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await run_search_and_forward(update, context, text,)
 
 async def add_chat( context: ContextTypes.DEFAULT_TYPE, update: Update):
+    strings = get_strings(user_lang(update.effective_user))
     chat_id = update.effective_message.api_kwargs['forward_from_chat']['id']
     logger.info(f'chat_id {chat_id} ')
     chat_name = context.user_data.get("pending_chat_name")
     chat_link = context.user_data.get("pending_chat_link")
     logger.info(f'chat_name {chat_name} chat_link {chat_link} chat_id {chat_id}')
     if not chat_name:
-        await update.effective_message.reply_text(STRINGS["invalid_chat_name_link"])
+        await update.effective_message.reply_text(strings["invalid_chat_name_link"])
     else:
         await bot_redis_store.set_chat(chat_name, chat_id, chat_link)
         await update.effective_message.reply_text(
-            STRINGS["chat_set_success"].format(
+            strings["chat_set_success"].format(
                 chat_name=chat_name, chat_link=chat_link
             )
         )
@@ -133,37 +102,44 @@ async def add_chat( context: ContextTypes.DEFAULT_TYPE, update: Update):
     context.user_data.pop("pending_chat_name", None)
 
 async def request_chat_link(text, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    strings = get_strings(user_lang(update.effective_user))
     context.user_data["pending_chat_name"] = text
     context.user_data["pending_chat_action"] = "add_link"
-    await update.effective_message.reply_text(STRINGS["chat_link_prompt"])
+    await update.effective_message.reply_text(strings["chat_link_prompt"])
 
 async def request_forward_chat(text, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    strings = get_strings(user_lang(update.effective_user))
     context.user_data["pending_chat_link"] = text
     context.user_data["pending_chat_action"] = "add_forward"
-    await update.effective_message.reply_text(STRINGS["forward_chat_prompt"])
+    await update.effective_message.reply_text(strings["forward_chat_prompt"])
 
 
 
 async def send_chat_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
+    strings = get_strings(user_lang(update.effective_user))
 
     if not await is_authorised(user_id, bot_redis_store):
         return
 
-    chats  = {chat_name: chat['link'] for chat_name, chat in (await bot_redis_store.get_chats()).items()}
+    version, registry = await bot_redis_store.get_chats_snapshot()
+    chats  = {chat_name: chat['link'] for chat_name, chat in registry.items()}
 
     if not chats:
-        await update.effective_message.reply_text(STRINGS["no_chats_added"])
+        await update.effective_message.reply_text(strings["no_chats_added"])
     else:
-        await update.effective_message.reply_text(STRINGS["current_chats"], reply_markup=bot_menus.chat_list_menu(chats))
+        await update.effective_message.reply_text(strings["current_chats"], reply_markup=bot_menus.chat_list_menu(
+            chats, version=version))
 
 
 async def add_admin(target_id: int, update: Update):
+    strings = get_strings(user_lang(update.effective_user))
     await bot_redis_store.add_admin(target_id)
-    await update.effective_message.reply_text(STRINGS["admin_added"])
+    await update.effective_message.reply_text(strings["admin_added"])
 
 
 async def remove_admin(target_id: int, update: Update):
+    strings = get_strings(user_lang(update.effective_user))
     await bot_redis_store.remove_admin(target_id)
-    await update.effective_message.reply_text(STRINGS["admin_removed"])
+    await update.effective_message.reply_text(strings["admin_removed"])
 
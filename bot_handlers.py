@@ -1,5 +1,5 @@
 
-import asyncio
+from datetime import datetime, timezone
 
 from dotenv import load_dotenv
 from telegram import Update
@@ -11,31 +11,35 @@ from telegram.ext import (
 )
 
 import bot_redis_store
-from bot_functions import check_membership, delete_chat, _broadcast, passive_find, add_chat, request_chat_link, \
+from bot_broadcast import enqueue_broadcast, parse_broadcast_args
+from bot_functions import check_membership, delete_chat, passive_find, add_chat, request_chat_link, \
     add_admin, remove_admin, send_chat_list, request_forward_chat
-from bot_helpers import TARGET_GROUP_ID, check_bot_admin, is_authorised, is_owner, logger, STRINGS
-from bot_menus import menu_admins, menu_chats, menu_root_owner, chat_list_menu
+from bot_helpers import TARGET_GROUP_ID, check_bot_admin, is_authorised, is_owner, logger, get_strings, user_lang
+from bot_menus import menu_admins, menu_chats, menu_root_owner, menu_back, chat_list_menu, jobs_menu
 
 load_dotenv()
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Greet the user and show quick-action button. Add the user to known hosts"""
-    await bot_redis_store.save_user(user_id=update.effective_user.id)
-    is_member = await check_membership(update.effective_user.id, context,)
+    lang = user_lang(update.effective_user)
+    await bot_redis_store.save_user(user_id=update.effective_user.id, lang=lang)
+    await bot_redis_store.record_activity(update.effective_user.id)
+    is_member = await check_membership(update.effective_user.id, context, lang)
     if not is_member:
         return
-    await update.effective_message.reply_text(STRINGS["start_greeting"])
+    await update.effective_message.reply_text(get_strings(lang)["start_greeting"])
 
 async def setowner(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/setowner – claim ownership (first run) or confirm env owner."""
     user_id = update.effective_user.id
+    strings = get_strings(user_lang(update.effective_user))
     current_owner = await bot_redis_store.get_owner()
     if current_owner and current_owner != user_id:
-        await update.effective_message.reply_text(STRINGS["owner_already_set"])
+        await update.effective_message.reply_text(strings["owner_already_set"])
         return
     await bot_redis_store.set_owner(user_id)
-    await update.effective_message.reply_text(STRINGS["owner_set_success"])
+    await update.effective_message.reply_text(strings["owner_set_success"])
     logger.info("Owner set to %s", user_id)
 
 
@@ -43,25 +47,41 @@ async def admin_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/admin – open management menus depending on role."""
     user_id = update.effective_user.id
     owner_id = await bot_redis_store.get_owner()
+    lang = user_lang(update.effective_user)
+    strings = get_strings(lang)
 
     if not await is_authorised(user_id, bot_redis_store):
         return
 
     if is_owner(user_id, owner_id):
 
-        await update.effective_message.reply_text(STRINGS["admin_manage_prompt"], reply_markup=menu_root_owner())
+        await update.effective_message.reply_text(strings["admin_manage_prompt"], reply_markup=menu_root_owner(lang))
     else:
-        await update.effective_message.reply_text(STRINGS["chat_manage_prompt"], reply_markup=menu_chats(is_owner(user_id, owner_id)))
+        await update.effective_message.reply_text(strings["chat_manage_prompt"], reply_markup=menu_chats(is_owner(user_id, owner_id), lang))
 
 
 async def broadcast_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    """Begin a broadcast – owner only."""
+    """Begin a broadcast – owner only. Args: [<N>m|h|d] [offpeak] [all|lang:<code>|active:<days>|chat:<name>]"""
+    strings = get_strings(user_lang(update.effective_user))
     if not is_owner(update.effective_user.id, await bot_redis_store.get_owner()):
-        await update.effective_message.reply_text(STRINGS["notify_not_owner"])
+        await update.effective_message.reply_text(strings["notify_not_owner"])
         return
 
+    opts = parse_broadcast_args(ctx.args)
+    if opts is None:
+        await update.effective_message.reply_text(strings["broadcast_usage"])
+        return
+    if opts["segment"].startswith("chat:"):
+        chat_name = opts["segment"][len("chat:"):]
+        if chat_name not in await bot_redis_store.get_chats():
+            await update.effective_message.reply_text(
+                strings["broadcast_unknown_chat"].format(chat_name=chat_name) + "\n" + strings["broadcast_usage"]
+            )
+            return
+
     ctx.user_data["pending_admin_action"] = "broadcast"
-    await update.effective_message.reply_text(STRINGS["broadcast_prompt"])
+    ctx.user_data["pending_broadcast"] = opts
+    await update.effective_message.reply_text(strings["broadcast_prompt"])
 
 async def store_incoming(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """store messages in db"""
@@ -89,9 +109,11 @@ async def handle_broadcast(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> No
     src_chat = update.effective_chat.id
     src_msg = update.effective_message.message_id
     owner_id = update.effective_user.id
+    lang = user_lang(update.effective_user)
+    opts = ctx.user_data.pop("pending_broadcast", None) or parse_broadcast_args(None)
 
-    asyncio.create_task(_broadcast(src_chat, src_msg, owner_id, update, ctx))
-    await update.effective_message.reply_text(STRINGS["broadcast_started"])
+    job_id = await enqueue_broadcast(src_chat, src_msg, owner_id, lang, opts)
+    await update.effective_message.reply_text(get_strings(lang)["broadcast_queued"].format(job_id=job_id))
 
 
 
@@ -101,8 +123,9 @@ async def handle_chat_add(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await is_authorised(user_id, bot_redis_store):
         return
 
+    strings = get_strings(user_lang(update.effective_user))
     context.user_data["pending_chat_action"] = "add_name"
-    await update.effective_message.reply_text(STRINGS["chat_name_prompt"])
+    await update.effective_message.reply_text(strings["chat_name_prompt"])
 
 
 async def handle_chat_remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -111,14 +134,15 @@ async def handle_chat_remove(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if not await is_authorised(user_id, bot_redis_store):
         return
 
-    chats = await bot_redis_store.get_chats()
+    strings = get_strings(user_lang(update.effective_user))
+    version, chats = await bot_redis_store.get_chats_snapshot()
 
     if not chats:
-        await update.effective_message.reply_text(STRINGS["no_chats_to_remove"])
+        await update.effective_message.reply_text(strings["no_chats_to_remove"])
         return
     await update.effective_message.reply_text(
-         STRINGS["select_chat_to_remove"],
-        reply_markup=chat_list_menu(chats, True)
+         strings["select_chat_to_remove"],
+        reply_markup=chat_list_menu(chats, True, version)
     )
 
 async def handle_chat_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -144,8 +168,9 @@ async def handle_chat_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def handle_admin_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     owner_id = await bot_redis_store.get_owner()
+    strings = get_strings(user_lang(update.effective_user))
     if not is_owner(user_id, owner_id):
-        await update.effective_message.reply_text(STRINGS["only_owner_manage_admins"])
+        await update.effective_message.reply_text(strings["only_owner_manage_admins"])
         return
 
     pending = context.user_data.get("pending_admin_action")
@@ -155,7 +180,7 @@ async def handle_admin_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await handle_broadcast(update, context)
     elif pending in {'add', 'remove'}:
         if not text.isdigit():
-            await update.effective_message.reply_text(STRINGS["send_numeric_user_id"])
+            await update.effective_message.reply_text(strings["send_numeric_user_id"])
             return
 
         target_id = int(text)
@@ -166,20 +191,20 @@ async def handle_admin_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
             await remove_admin(target_id, update)
     else:
 
-        await update.effective_message.reply_text(STRINGS["unknown_pending_action"])
+        await update.effective_message.reply_text(strings["unknown_pending_action"])
 
 
     context.user_data.pop("pending_admin_action", None)
 
 
-async def handle_main_menu(query):
-    await query.edit_message_text(STRINGS["menu_management"], reply_markup=menu_root_owner())
+async def handle_main_menu(query, lang):
+    await query.edit_message_text(get_strings(lang)["menu_management"], reply_markup=menu_root_owner(lang))
 
-async def handle_admin_menu(query):
-    await query.edit_message_text(STRINGS["admin_management"], reply_markup=menu_admins())
+async def handle_admin_menu(query, lang):
+    await query.edit_message_text(get_strings(lang)["admin_management"], reply_markup=menu_admins(lang))
 
-async def handle_chat_menu(query, user_id, owner_id):
-    await query.edit_message_text(STRINGS["chat_management"], reply_markup=menu_chats(is_owner(user_id, owner_id)))
+async def handle_chat_menu(query, user_id, owner_id, lang):
+    await query.edit_message_text(get_strings(lang)["chat_management"], reply_markup=menu_chats(is_owner(user_id, owner_id), lang))
 
 
 async def handle_chat_action(update: Update, context: ContextTypes.DEFAULT_TYPE, data):
@@ -196,27 +221,66 @@ async def handle_chat_action(update: Update, context: ContextTypes.DEFAULT_TYPE,
         await send_chat_list(update, context)
         return
 
-async def handle_admin_action(query, data, owner_id, context):
+async def handle_admin_action(query, data, owner_id, context, lang):
+    strings = get_strings(lang)
     action = data.split("_", 1)[1]
     if action == "list":
         admins = await bot_redis_store.list_admins()
         admins_txt = ", ".join(str(a) for a in sorted(admins)) or "(none)"
         await query.edit_message_text(
-            STRINGS["current_admins"].format(owner_id=owner_id,
+            strings["current_admins"].format(owner_id=owner_id,
                                              admins=admins_txt),
-            reply_markup=menu_admins(),
+            reply_markup=menu_admins(lang),
         )
         return
 
     context.user_data["pending_admin_action"] = action
-    await query.edit_message_text(STRINGS["send_user_id_prompt"].format(action))
+    await query.edit_message_text(strings["send_user_id_prompt"].format(action))
+
+
+async def handle_jobs_action(query, data, user_id, owner_id, lang):
+    strings = get_strings(lang)
+    if not is_owner(user_id, owner_id):
+        await query.edit_message_text(strings["only_owner_manage_broadcasts"])
+        return
+
+    action, _, job_id = data[len("jobs_"):].partition(":")
+    # Stale buttons may point at finished or expired jobs; the transitions
+    # are no-ops for those.
+    if action == "pause":
+        await bot_redis_store.transition_broadcast_job(job_id, "paused", ("scheduled", "running"))
+    elif action == "resume":
+        await bot_redis_store.transition_broadcast_job(job_id, "scheduled", ("paused",))
+    elif action == "cancel":
+        await bot_redis_store.transition_broadcast_job(job_id, "cancelled", ("scheduled", "running", "paused"))
+
+    jobs = await bot_redis_store.list_broadcast_jobs()
+    lines = [
+        strings["broadcast_job_line"].format(
+            id=job["id"], status=job["status"], segment=job["segment"],
+            run_at=datetime.fromtimestamp(float(job["run_at"]), timezone.utc).strftime("%Y-%m-%d %H:%M"),
+            successes=job["successes"], fails=job["fails"],
+        )
+        for job in jobs
+    ]
+    text = strings["broadcast_jobs"].format(jobs="\n".join(lines)) if lines else strings["no_broadcast_jobs"]
+    await query.edit_message_text(text, reply_markup=jobs_menu(jobs, lang))
+
+async def handle_stats(query, user_id, owner_id, lang):
+    strings = get_strings(lang)
+    if not is_owner(user_id, owner_id):
+        await query.edit_message_text(strings["only_owner_view_stats"])
+        return
 
+    counts = await bot_redis_store.get_active_counts()
+    await query.edit_message_text(strings["activity_stats"].format(**counts), reply_markup=menu_back(lang))
 
 
 async def callback_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user_id = query.from_user.id
     owner_id = await bot_redis_store.get_owner()
+    lang = user_lang(query.from_user)
 
     await query.answer()
 
@@ -232,17 +296,21 @@ async def callback_query_handler(update: Update, context: ContextTypes.DEFAULT_T
 
     # Dispatch to specific handlers
     if data == "main_menu":
-        await handle_main_menu(query)
+        await handle_main_menu(query, lang)
     elif data == "menu_admins":
-        await handle_admin_menu(query)
+        await handle_admin_menu(query, lang)
     elif data == "menu_chats":
-        await handle_chat_menu(query, user_id, owner_id)
+        await handle_chat_menu(query, user_id, owner_id, lang)
     elif data.startswith("chat_"):
         await handle_chat_action(update, context, data)
     elif data.startswith("admin_"):
-        await handle_admin_action(query, data, owner_id, context)
+        await handle_admin_action(query, data, owner_id, context, lang)
+    elif data.startswith("jobs_"):
+        await handle_jobs_action(query, data, user_id, owner_id, lang)
+    elif data == "stats_show":
+        await handle_stats(query, user_id, owner_id, lang)
     else:
-        await query.answer(STRINGS["unknown_action"])
+        await query.answer(get_strings(lang)["unknown_action"])
 
 async def handle_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Process inputs"""
@@ -250,6 +318,10 @@ async def handle_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if context.user_data is None :
         logger.info(f'context.user_data is empty')
         return
+    # Group chatter comes from people who may never have started the bot;
+    # counting them would inflate DAU and feed active:<days> broadcasts.
+    if update.effective_user and update.effective_chat.type == "private":
+        await bot_redis_store.record_activity(update.effective_user.id, user_lang(update.effective_user))
 
     action = context.user_data.get("pending_chat_action")
     if action:
@@ -258,7 +330,7 @@ async def handle_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     pending = context.user_data.get("pending_admin_action")
     if not pending:
-        is_member = await check_membership(update.effective_user.id, context, )
+        is_member = await check_membership(update.effective_user.id, context, user_lang(update.effective_user))
         if not is_member:
             return
         await passive_find(update, context)
@@ -272,6 +344,7 @@ def register(application, ):
     application.add_handler(CommandHandler("setowner", setowner))
     application.add_handler(CommandHandler("admin", admin_cmd))
     application.add_handler(CommandHandler("manage", admin_cmd))
+    application.add_handler(CommandHandler("broadcast", broadcast_cmd))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_input))
     application.add_handler(MessageHandler(filters.FORWARDED, handle_input))
     application.add_handler(CallbackQueryHandler(callback_query_handler))
@@ -2,6 +2,7 @@ import asyncio
 import os
 import logging
 import json
+import glob
 
 from dotenv import load_dotenv
 from telegram.ext import ContextTypes
@@ -26,13 +27,57 @@ def setup_logging() -> logging.Logger:
 
 logger = setup_logging()
 
-RES_PATH = os.getenv("RES_JSON_PATH", "res.json")
+# -----------------------------
+# Localization bundles
+# -----------------------------
+DEFAULT_LANG: str = os.getenv("BOT_LANG", "en")
+RES_DIR: str = os.getenv("RES_DIR", ".")
+
+
+def load_bundles(input_dir: str = RES_DIR) -> dict[str, dict]:
+    """Load every res.<lang>.json in *input_dir* into memory, keyed by lang.
+
+    Keys missing from a bundle fall back to the DEFAULT_LANG one.
+    """
+    bundles: dict[str, dict] = {}
+    for path in glob.glob(os.path.join(input_dir, "res.*.json")):
+        lang = os.path.basename(path)[len("res."):-len(".json")]
+        with open(path, encoding="utf-8") as f:
+            bundles[lang] = json.load(f)
+
+    if DEFAULT_LANG not in bundles:
+        raise RuntimeError(f"No resource bundle for BOT_LANG={DEFAULT_LANG!r} in {input_dir!r}")
+
+    default = bundles[DEFAULT_LANG]
+    return {lang: {**default, **data} for lang, data in bundles.items()}
+
+
 try:
-    with open(RES_PATH, encoding="utf-8") as f:
-        STRINGS = json.load(f)
+    BUNDLES = load_bundles()
 except Exception as e:
     raise RuntimeError(f"Could not load resources: {e}")
 
+STRINGS = BUNDLES[DEFAULT_LANG]
+
+
+def resolve_lang(language_code: str | None) -> str:
+    """Map a Telegram language_code (e.g. "ru" or "en-US") onto a loaded bundle."""
+    if language_code:
+        base = language_code.split("-", 1)[0].lower()
+        if base in BUNDLES:
+            return base
+    return DEFAULT_LANG
+
+
+def user_lang(user) -> str:
+    """Return the bundle language for a telegram User (or None)."""
+    return resolve_lang(getattr(user, "language_code", None))
+
+
+def get_strings(lang: str | None) -> dict:
+    """Return the string bundle for *lang*, falling back to DEFAULT_LANG."""
+    return BUNDLES.get(lang or DEFAULT_LANG, STRINGS)
+
 
 
 # -----------------------------
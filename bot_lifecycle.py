@@ -0,0 +1,51 @@
+import asyncio
+import os
+
+import bot_redis_store
+from bot_helpers import logger
+
+# -----------------------------
+# Background task tracking & graceful shutdown
+# -----------------------------
+# run_polling() stops the updater on SIGINT/SIGTERM before post_stop runs,
+# so by the time drain_on_stop() is called no new updates are accepted.
+# The bot is still usable there (it is only shut down afterwards), which
+# lets in-flight work finish or checkpoint before the deadline.
+
+DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20"))
+
+stopping = asyncio.Event()
+_tasks: set[asyncio.Task] = set()
+
+
+def track(coro, name: str | None = None) -> asyncio.Task:
+    """Start *coro* as a task and keep a reference until it finishes."""
+    task = asyncio.create_task(coro, name=name)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def drain(timeout: float = DRAIN_TIMEOUT) -> None:
+    """Wait up to *timeout* seconds for tracked tasks, then cancel the rest."""
+    if not _tasks:
+        return
+    logger.info("Draining %s background tasks (deadline %ss)", len(_tasks), timeout)
+    _, pending = await asyncio.wait(set(_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning("Cancelled %s background tasks past the drain deadline", len(pending))
+
+
+async def drain_on_stop(application) -> None:
+    """post_stop hook: signal background work to wind down and drain it."""
+    stopping.set()
+    await drain()
+
+
+async def close_on_shutdown(application) -> None:
+    """post_shutdown hook: close the Redis connection pool."""
+    await bot_redis_store.close()
+    logger.info("Redis connection pool closed")
@@ -1,32 +1,93 @@
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton
-from bot_helpers import STRINGS
+from bot_helpers import BUNDLES, DEFAULT_LANG, get_strings
 
-def menu_chats(is_owner) -> InlineKeyboardMarkup:
+# -----------------------------
+# Static menus (built once per language at import)
+# -----------------------------
+
+def _build_menu_chats(strings: dict, is_owner: bool) -> InlineKeyboardMarkup:
     rows = [
-        [InlineKeyboardButton(STRINGS["btn_add_chat"], callback_data="chat_add")],
-        [InlineKeyboardButton(STRINGS["btn_remove_chat"], callback_data="chat_remove")],
-        [InlineKeyboardButton(STRINGS["btn_list_chats"], callback_data="chat_list")],
-        [InlineKeyboardButton(STRINGS["btn_broadcast_message"], callback_data="chat_notify")],
+        [InlineKeyboardButton(strings["btn_add_chat"], callback_data="chat_add")],
+        [InlineKeyboardButton(strings["btn_remove_chat"], callback_data="chat_remove")],
+        [InlineKeyboardButton(strings["btn_list_chats"], callback_data="chat_list")],
+        [InlineKeyboardButton(strings["btn_broadcast_message"], callback_data="chat_notify")],
     ]
     if is_owner:
-        rows.append([InlineKeyboardButton(STRINGS["btn_return_back"], callback_data="main_menu")])
+        rows.append([InlineKeyboardButton(strings["btn_return_back"], callback_data="main_menu")])
     return InlineKeyboardMarkup(rows)
 
-def menu_admins() -> InlineKeyboardMarkup:
+def _build_menu_admins(strings: dict) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([
-        [InlineKeyboardButton(STRINGS["btn_add_admin"], callback_data="admin_add")],
-        [InlineKeyboardButton(STRINGS["btn_remove_admin"], callback_data="admin_remove")],
-        [InlineKeyboardButton(STRINGS["btn_list_admins"], callback_data="admin_list")],
-        [InlineKeyboardButton(STRINGS["btn_return_back"], callback_data="main_menu")],
+        [InlineKeyboardButton(strings["btn_add_admin"], callback_data="admin_add")],
+        [InlineKeyboardButton(strings["btn_remove_admin"], callback_data="admin_remove")],
+        [InlineKeyboardButton(strings["btn_list_admins"], callback_data="admin_list")],
+        [InlineKeyboardButton(strings["btn_return_back"], callback_data="main_menu")],
     ])
 
-def menu_root_owner() -> InlineKeyboardMarkup:
+def _build_menu_root_owner(strings: dict) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([
-        [InlineKeyboardButton(STRINGS["btn_manage_admins"], callback_data="menu_admins")],
-        [InlineKeyboardButton(STRINGS["btn_manage_chats"], callback_data="menu_chats")],
+        [InlineKeyboardButton(strings["btn_manage_admins"], callback_data="menu_admins")],
+        [InlineKeyboardButton(strings["btn_manage_chats"], callback_data="menu_chats")],
+        [InlineKeyboardButton(strings["btn_broadcast_jobs"], callback_data="jobs_list")],
+        [InlineKeyboardButton(strings["btn_activity_stats"], callback_data="stats_show")],
     ])
 
-def chat_list_menu(chats: dict, for_removal: bool = False) -> InlineKeyboardMarkup:
+def _build_menu_back(strings: dict) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(strings["btn_return_back"], callback_data="main_menu")],
+    ])
+
+_MENUS: dict[str, dict] = {
+    lang: {
+        "chats": {False: _build_menu_chats(strings, False), True: _build_menu_chats(strings, True)},
+        "admins": _build_menu_admins(strings),
+        "root_owner": _build_menu_root_owner(strings),
+        "back": _build_menu_back(strings),
+    }
+    for lang, strings in BUNDLES.items()
+}
+
+def _menus(lang: str | None) -> dict:
+    return _MENUS.get(lang or DEFAULT_LANG, _MENUS[DEFAULT_LANG])
+
+def menu_chats(is_owner, lang: str | None = None) -> InlineKeyboardMarkup:
+    return _menus(lang)["chats"][bool(is_owner)]
+
+def menu_admins(lang: str | None = None) -> InlineKeyboardMarkup:
+    return _menus(lang)["admins"]
+
+def menu_root_owner(lang: str | None = None) -> InlineKeyboardMarkup:
+    return _menus(lang)["root_owner"]
+
+def menu_back(lang: str | None = None) -> InlineKeyboardMarkup:
+    return _menus(lang)["back"]
+
+# -----------------------------
+# Chat list menus (full list cached per chat-registry version)
+# -----------------------------
+_chat_menu_version: int | None = None
+_chat_menu_cache: dict[bool, InlineKeyboardMarkup] = {}
+
+def chat_list_menu(chats: dict, for_removal: bool = False, version: int | None = None) -> InlineKeyboardMarkup:
+    """Build (or reuse) the chat list keyboard.
+
+    Pass *version* only when *chats* is the whole registry at that version
+    (bot_redis_store.get_chats_snapshot()); that keyboard is reused until the
+    registry changes. Subsets, like a user's missing chats, are built fresh.
+    """
+    global _chat_menu_version
+    if version is None:
+        return _build_chat_list_menu(chats, for_removal)
+
+    if version != _chat_menu_version:
+        _chat_menu_cache.clear()
+        _chat_menu_version = version
+    markup = _chat_menu_cache.get(for_removal)
+    if markup is None:
+        markup = _chat_menu_cache[for_removal] = _build_chat_list_menu(chats, for_removal)
+    return markup
+
+def _build_chat_list_menu(chats: dict, for_removal: bool) -> InlineKeyboardMarkup:
     rows = []
     for name, link in chats.items():
         if for_removal:
@@ -34,3 +95,20 @@ def chat_list_menu(chats: dict, for_removal: bool = False) -> InlineKeyboardMark
         else:
             rows.append([InlineKeyboardButton(name, url=link)])
     return InlineKeyboardMarkup(rows)
+
+# -----------------------------
+# Broadcast job menu (built per call, jobs change while sending)
+# -----------------------------
+
+def jobs_menu(jobs: list[dict], lang: str | None = None) -> InlineKeyboardMarkup:
+    strings = get_strings(lang)
+    rows = []
+    for job in jobs:
+        job_id = job["id"]
+        if job["status"] == "paused":
+            toggle = InlineKeyboardButton(strings["btn_job_resume"].format(id=job_id), callback_data=f"jobs_resume:{job_id}")
+        else:
+            toggle = InlineKeyboardButton(strings["btn_job_pause"].format(id=job_id), callback_data=f"jobs_pause:{job_id}")
+        rows.append([toggle, InlineKeyboardButton(strings["btn_job_cancel"].format(id=job_id), callback_data=f"jobs_cancel:{job_id}")])
+    rows.append([InlineKeyboardButton(strings["btn_return_back"], callback_data="main_menu")])
+    return InlineKeyboardMarkup(rows)
@@ -1,4 +1,6 @@
 import os
+import time
+from datetime import datetime, timedelta, timezone
 
 import redis
 import redis.asyncio as redis_lib  # use alias to avoid self‑import confusion
@@ -13,11 +15,27 @@ from bot_helpers import TARGET_GROUP_ID, int_or_none, logger
 REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 redis_client: "redis_lib.Redis" = redis_lib.from_url(REDIS_URL, decode_responses=True)
 
+
+async def close():
+    """Close the client and disconnect every pooled connection."""
+    # redis>=5 renamed close() to aclose()
+    await getattr(redis_client, "aclose", redis_client.close)()
+    await redis_client.connection_pool.disconnect()
+
 OWNER_KEY = "bot:owner"
 ADMINS_KEY = "bot:admins"
 CHATS_KEY = "hash-idx:marketing"
+CHATS_VERSION_KEY = "bot:chats:version"
 HASH_KEY = f"chat:{TARGET_GROUP_ID}:texts"
 USERS = "bot:users"
+USERS_LANG_KEY = "bot:users:lang"
+LAST_SEEN_KEY = "bot:users:last_seen"
+ACTIVITY_KEY = "bot:active:{day}"
+ACTIVITY_TTL = 35 * 24 * 3600
+BROADCAST_JOBS_KEY = "broadcast:jobs"
+BROADCAST_SEQ_KEY = "broadcast:seq"
+BROADCAST_LEADER_KEY = "broadcast:leader"
+BROADCAST_JOB_TTL = 7 * 24 * 3600
 MAX_HISTORY = 10_000
 
 # -----------------------------
@@ -46,14 +64,56 @@ async def set_owner(user_id: int):
     await redis_client.set(OWNER_KEY, user_id)
 
 
-async def save_user(user_id: int):
+async def save_user(user_id: int, lang: str | None = None):
     await redis_client.sadd(USERS, user_id)
+    if lang:
+        await redis_client.hset(USERS_LANG_KEY, user_id, lang)
 
 
-async def get_users() -> set[str]:
+async def get_users(lang: str | None = None) -> set[str]:
+    if lang:
+        langs = await redis_client.hgetall(USERS_LANG_KEY)
+        return {uid for uid, user_lang in langs.items() if user_lang == lang}
     return await redis_client.smembers(USERS)
 
 
+# -----------------------------
+# Activity tracking
+# -----------------------------
+# One HyperLogLog per UTC day gives DAU/WAU/MAU in constant memory;
+# the last_seen sorted set (user → unix time) lets broadcasts target
+# recently active users.
+
+def _activity_keys(days: int) -> list[str]:
+    today = datetime.now(timezone.utc).date()
+    return [ACTIVITY_KEY.format(day=today - timedelta(days=n)) for n in range(days)]
+
+
+async def record_activity(user_id: int, lang: str | None = None):
+    """Count *user_id* as active today; also refresh their language if given."""
+    key = _activity_keys(1)[0]
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.pfadd(key, user_id)
+    pipe.expire(key, ACTIVITY_TTL)
+    pipe.zadd(LAST_SEEN_KEY, {user_id: time.time()})
+    if lang:
+        pipe.hset(USERS_LANG_KEY, user_id, lang)
+    await pipe.execute()
+
+
+async def get_active_counts() -> dict[str, int]:
+    """Approximate distinct active users over the last 1, 7 and 30 days."""
+    pipe = redis_client.pipeline(transaction=False)
+    for days in (1, 7, 30):
+        pipe.pfcount(*_activity_keys(days))
+    dau, wau, mau = await pipe.execute()
+    return {"dau": dau, "wau": wau, "mau": mau}
+
+
+async def get_active_users(days: int) -> set[str]:
+    return set(await redis_client.zrangebyscore(LAST_SEEN_KEY, time.time() - days * 86400, "+inf"))
+
+
 async def is_admin(user_id: int) -> bool:
     return bool(await redis_client.sismember(ADMINS_KEY, str(user_id)))
 
@@ -70,14 +130,35 @@ async def list_admins():
     return await redis_client.smembers(ADMINS_KEY)
 
 
+_chats_cache: tuple[int, dict] | None = None
+
+
+async def get_chats_snapshot() -> tuple[int, dict]:
+    """Return (registry version, chats).
+
+    The chat index is only searched again when the version changed, so the
+    usual cost is one GET. Treat the returned dict as read-only.
+    """
+    global _chats_cache
+    version = await get_chats_version()
+    if _chats_cache is None or _chats_cache[0] != version:
+        result = await redis_client.ft(CHATS_KEY).search(Query("*"))
+        logger.info(f"Got {len(result.docs)} {result} {result.docs} chats")
+        _chats_cache = (version, {doc.id.replace('marketing:', ''): {
+            'name': doc.name,
+            'chat_id': int(doc.chat_id),
+            'link': doc.link
+        } for doc in result.docs})
+    return _chats_cache
+
+
 async def get_chats():
-    result = await redis_client.ft(CHATS_KEY).search(Query("*"))
-    logger.info(f"Got {len(result.docs)} {result} {result.docs} chats")
-    return {doc.id.replace('marketing:', ''): {
-        'name': doc.name,
-        'chat_id': int(doc.chat_id),
-        'link': doc.link
-    } for doc in result.docs}
+    return (await get_chats_snapshot())[1]
+
+
+async def get_chats_version() -> int:
+    """Counter bumped on every chat add/remove; invalidates cached chats and menus."""
+    return int(await redis_client.get(CHATS_VERSION_KEY) or 0)
 
 
 async def set_chat(chat_name: str, chat_id: int, chat_link: str):
@@ -88,9 +169,11 @@ async def set_chat(chat_name: str, chat_id: int, chat_link: str):
     }
     # Store chat data as JSON
     await redis_client.hset(f"marketing:{chat_name}", mapping=chat_data)
+    await redis_client.incr(CHATS_VERSION_KEY)
 
 async def del_chat(chat_name: str):
     await redis_client.delete(f"marketing:{chat_name}")
+    await redis_client.incr(CHATS_VERSION_KEY)
     # await redis_client.ft(f"marketing:{chat_name}").delete_document(f"marketing:{chat_name}").execute()
     logger.info(f"Deleted chat from redis {chat_name}")
 
@@ -134,3 +217,145 @@ async def do_search(query: str) -> list[int]:
             results.append(int(mid))
 
     return results
+
+
+# -----------------------------
+# Broadcast job queue
+# -----------------------------
+# Each job is a hash at broadcast:job:<id>; unfinished job ids live in the
+# broadcast:jobs sorted set scored by their scheduled send time.
+
+_RENEW_LEADER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LEADER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Claim a job for a worker: scheduled jobs are free; a running job is only
+# taken over when its recorded worker no longer holds the leader lease.
+_CLAIM_JOB = """
+local status = redis.call('hget', KEYS[1], 'status')
+if status == 'running' then
+    local owner = redis.call('hget', KEYS[1], 'worker')
+    if owner ~= ARGV[1] and owner == redis.call('get', KEYS[2]) then
+        return 0
+    end
+elseif status ~= 'scheduled' then
+    return 0
+end
+redis.call('hset', KEYS[1], 'status', 'running', 'worker', ARGV[1])
+return 1
+"""
+
+# Compare-and-set a job status. ARGV: new status, job id, ttl, allowed
+# current statuses... Finishing states also leave the queue and expire.
+# A missing hash is never recreated, only dropped from the queue.
+_TRANSITION_JOB = """
+local status = redis.call('hget', KEYS[1], 'status')
+if not status then
+    redis.call('zrem', KEYS[2], ARGV[2])
+    return 0
+end
+for i = 4, #ARGV do
+    if status == ARGV[i] then
+        redis.call('hset', KEYS[1], 'status', ARGV[1])
+        if ARGV[1] == 'done' or ARGV[1] == 'cancelled' then
+            redis.call('zrem', KEYS[2], ARGV[2])
+            redis.call('expire', KEYS[1], ARGV[3])
+        end
+        return 1
+    end
+end
+return 0
+"""
+
+
+def _job_key(job_id) -> str:
+    return f"broadcast:job:{job_id}"
+
+
+async def create_broadcast_job(job: dict, run_at: float) -> int:
+    """Persist *job* and queue it for *run_at* (unix time). Returns the job id."""
+    job_id = await redis_client.incr(BROADCAST_SEQ_KEY)
+    await redis_client.hset(_job_key(job_id), mapping={
+        **job,
+        "id": job_id,
+        "status": "scheduled",
+        "run_at": run_at,
+        "cursor": 0,
+        "successes": 0,
+        "fails": 0,
+    })
+    await redis_client.zadd(BROADCAST_JOBS_KEY, {job_id: run_at})
+    return job_id
+
+
+async def get_broadcast_job(job_id) -> dict:
+    return await redis_client.hgetall(_job_key(job_id))
+
+
+async def update_broadcast_job(job_id, **fields):
+    await redis_client.hset(_job_key(job_id), mapping=fields)
+
+
+async def list_broadcast_jobs() -> list[dict]:
+    """Return all unfinished jobs ordered by send time."""
+    ids = await redis_client.zrange(BROADCAST_JOBS_KEY, 0, -1)
+    pipe = redis_client.pipeline()
+    for job_id in ids:
+        pipe.hgetall(_job_key(job_id))
+    return [job for job in await pipe.execute() if job]
+
+
+async def due_broadcast_jobs(now: float) -> list[str]:
+    return await redis_client.zrangebyscore(BROADCAST_JOBS_KEY, "-inf", now)
+
+
+async def reschedule_broadcast_job(job_id, run_at: float):
+    await redis_client.hset(_job_key(job_id), "run_at", run_at)
+    await redis_client.zadd(BROADCAST_JOBS_KEY, {job_id: run_at})
+
+
+async def transition_broadcast_job(job_id, status: str, allowed: tuple[str, ...]) -> bool:
+    """Set the job *status* only if its current one is in *allowed*.
+
+    "done"/"cancelled" also drop it from the queue and let it expire.
+    Returns False when the job is gone or in another state.
+    """
+    return bool(await redis_client.eval(
+        _TRANSITION_JOB, 2, _job_key(job_id), BROADCAST_JOBS_KEY,
+        status, job_id, BROADCAST_JOB_TTL, *allowed,
+    ))
+
+
+async def drop_broadcast_job(job_id):
+    """Remove a finished or vanished job id from the queue."""
+    await redis_client.zrem(BROADCAST_JOBS_KEY, job_id)
+
+
+async def acquire_broadcast_leader(token: str, ttl_ms: int) -> bool:
+    """Take or renew the broadcast worker lease; only one replica holds it."""
+    if await redis_client.set(BROADCAST_LEADER_KEY, token, nx=True, px=ttl_ms):
+        return True
+    return bool(await redis_client.eval(_RENEW_LEADER, 1, BROADCAST_LEADER_KEY, token, ttl_ms))
+
+
+async def is_broadcast_leader(token: str) -> bool:
+    return await redis_client.get(BROADCAST_LEADER_KEY) == token
+
+
+async def claim_broadcast_job(job_id, worker: str) -> bool:
+    """Atomically mark the job running under *worker*; False if it may not run."""
+    return bool(await redis_client.eval(_CLAIM_JOB, 2, _job_key(job_id), BROADCAST_LEADER_KEY, worker))
+
+
+async def release_broadcast_leader(token: str):
+    await redis_client.eval(_RELEASE_LEADER, 1, BROADCAST_LEADER_KEY, token)
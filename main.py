@@ -1,25 +1,20 @@
 #!/usr/bin/env python3
-import os
-
-from dotenv import load_dotenv
-
-# build_resources must run before any strings are used
-from build_resources import build_resources
-
-load_dotenv()
-
-# pick the language and build
-LANG = os.getenv("BOT_LANG", "en")
-build_resources(LANG)
-
 from telegram.ext import ApplicationBuilder
-from bot_helpers import logger, STRINGS, TOKEN
+from bot_helpers import logger, STRINGS, TOKEN, BUNDLES, DEFAULT_LANG
 from bot_handlers import register
+from bot_broadcast import start_worker
+from bot_lifecycle import drain_on_stop, close_on_shutdown
 
 def main() -> None:
-    logger.info(f'The bot is running with lang {LANG}'
-                f'')
-    app = ApplicationBuilder().token(TOKEN).build()
+    logger.info(f'The bot is running with langs {sorted(BUNDLES)} (default {DEFAULT_LANG})')
+    app = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .post_init(start_worker)
+        .post_stop(drain_on_stop)
+        .post_shutdown(close_on_shutdown)
+        .build()
+    )
     register(app)
     try:
         app.run_polling()